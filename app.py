@@ -11,7 +11,7 @@ from components.cbt_exercises import render_cbt_exercises
 from components.breathing_exercises import render_breathing_exercises
 from components.psychoeducation import render_psychoeducation
 from utils.data_manager import DataManager
-from utils.crisis_detection import CrisisDetector
+from utils.crisis_detection import get_crisis_detector
 
 # Initialize session state for anonymous user
 if 'user_id' not in st.session_state:
@@ -22,7 +22,7 @@ if 'data_manager' not in st.session_state:
     st.session_state.data_manager = DataManager(st.session_state.user_id)
 
 if 'crisis_detector' not in st.session_state:
-    st.session_state.crisis_detector = CrisisDetector()
+    st.session_state.crisis_detector = get_crisis_detector()
 
 # Set page configuration
 st.set_page_config(
@@ -109,7 +109,7 @@
 
 import streamlit as st
 from datetime import datetime
-from utils.gemini_client import GeminiClient
+from utils.gemini_client import get_gemini_client
 from data.cbt_prompts import CBT_EXERCISES, COGNITIVE_DISTORTIONS
 
 def render_cbt_exercises():
@@ -123,7 +123,7 @@ def render_cbt_exercises():
 
     # Initialize Gemini client
     if 'gemini_client' not in st.session_state:
-        st.session_state.gemini_client = GeminiClient()
+        st.session_state.gemini_client = get_gemini_client()
     
     # Create tabs
     tab1, tab2, tab3, tab4 = st.tabs(
@@ -194,7 +194,9 @@ def render_thought_record():
             ai_insights = {}
             with st.spinner("Getting AI insights..."):
                 try:
-                    ai_insights = st.session_state.gemini_client.generate_cbt_insight(thought_record)
+                    ai_insights = st.session_state.gemini_client.generate_cbt_insight(
+                        thought_record, prompt_cache=st.session_state.prompt_cache
+                    )
                     if "balanced_thoughts" in ai_insights and isinstance(ai_insights["balanced_thoughts"], str): 
                         ai_insights["balanced_thoughts"] = [ai_insights["balanced_thoughts"]]
                 except Exception as e:
@@ -1,11 +1,100 @@
 # components/chat_interface.py
 
 import streamlit as st # type: ignore
-from utils.gemini_client import GeminiClient
-from utils.crisis_detection import CrisisDetector
+from utils.gemini_client import get_gemini_client, RECENT_TURNS
+from utils.crisis_detection import get_crisis_detector
 from utils.data_manager import DataManager
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import time
 import uuid
 
+logger = logging.getLogger(__name__)
+
+
+@st.cache_resource
+def _get_summary_executor():
+    # Conversation summaries are generated off the script thread between turns
+    return ThreadPoolExecutor(max_workers=2)
+
+
+def _throttle(chunks, min_interval=0.05):
+    """Batch streamed chunks so the UI is updated at most every min_interval seconds"""
+    buffer = ""
+    last_flush = time.monotonic()
+    for chunk in chunks:
+        buffer += chunk
+        now = time.monotonic()
+        if now - last_flush >= min_interval:
+            yield buffer
+            buffer = ""
+            last_flush = now
+    if buffer:
+        yield buffer
+
+
+def _resolve_summary():
+    """Apply the background conversation summary once it has finished"""
+    pending = st.session_state.get("summary_future")
+    if pending is None:
+        return
+    future, covered = pending
+    if not future.done():
+        # Still running: prompts keep using the uncovered messages meanwhile
+        return
+    st.session_state.summary_future = None
+    try:
+        summary = future.result()
+    except Exception:
+        logger.exception("Failed to summarize conversation")
+        summary = None
+    if summary:
+        st.session_state.chat_summary = summary
+    else:
+        logger.warning("Conversation summary unavailable; keeping the previous one")
+    # Advance even on failure so a summary that keeps failing is not retried
+    # with an ever larger transcript
+    st.session_state.summarized_messages = covered
+
+
+def _schedule_summary():
+    """Fold messages older than the recent turns into the summary, in the background"""
+    total = len(st.session_state.chat_history)
+    start = st.session_state.summarized_messages
+    if (st.session_state.gemini_client is None
+            or total - start < st.session_state.formatted_history.maxlen
+            or st.session_state.get("summary_future") is not None):
+        return
+    end = total - 2 * RECENT_TURNS
+    start = max(start, end - st.session_state.formatted_history.maxlen)
+    future = _get_summary_executor().submit(
+        st.session_state.gemini_client.summarize_conversation,
+        st.session_state.chat_summary,
+        st.session_state.data_manager.get_transcript(start, end)
+    )
+    st.session_state.summary_future = (future, end)
+
+
+def _prompt_history():
+    """History lines for the next prompt, never more than formatted_history holds
+
+    With a summary only the messages it does not cover are sent, at least
+    the last RECENT_TURNS turns. If summaries fall behind, the full rolling
+    window is sent as without one.
+    """
+    lines = list(st.session_state.formatted_history)
+    if not st.session_state.chat_summary:
+        return lines
+    uncovered = len(st.session_state.chat_history) - st.session_state.summarized_messages
+    return lines[-uncovered:] if 0 < uncovered < len(lines) else lines
+
+
+def _render_history(history):
+    for message in history:
+        with st.chat_message(message["role"]):
+            st.markdown(message["content"])
+
+
 def render_chat_interface():
     st.header("💬 Chat Support")
     st.markdown("Choose your support style and start a conversation.")
@@ -21,14 +110,14 @@ def render_chat_interface():
     # Initialize Gemini client (show friendly message if missing)
     if 'gemini_client' not in st.session_state:
         try:
-            st.session_state.gemini_client = GeminiClient()
+            st.session_state.gemini_client = get_gemini_client()
         except Exception as e:
             st.error(f"Gemini client init error: {e}")
             st.session_state.gemini_client = None
     
-    # Initialize crisis detector (will reuse session gemini_client if present)
+    # Initialize crisis detector (shares the cached gemini client)
     if 'crisis_detector' not in st.session_state:
-        st.session_state.crisis_detector = CrisisDetector()
+        st.session_state.crisis_detector = get_crisis_detector()
     
     # Persona selection
     col1, col2, col3 = st.columns(3)
@@ -49,51 +138,106 @@ def render_chat_interface():
     st.info(f"Current support style: {persona_names.get(st.session_state.current_persona, 'Therapist')}")
     
     # Chat history display
-    for message in st.session_state.get('chat_history', []):
-        with st.chat_message(message["role"]):
-            st.write(message["content"])
+    _render_history(st.session_state.get('chat_history', []))
 
     # Chat input
     user_input = st.chat_input("What's on your mind?")
-    print("DEBUG-SENDING-TO-GEMINI:", user_input) ##added lines
 
     if user_input:
-        # Save user message
+        _resolve_summary()
+        # History is read before saving so the new message isn't sent twice
+        history_lines = _prompt_history()
+
+        # Save the user message right away so it survives a failed reply
+        user_message = None
         try:
-            st.session_state.data_manager.save_chat_message("user", user_input, persona=st.session_state.current_persona)
+            user_message = st.session_state.data_manager.save_chat_message(
+                "user", user_input, persona=st.session_state.current_persona
+            )
         except Exception as e:
             st.error(f"Error saving user message: {e}")
-        
-        # Crisis detection
-        risk_assessment = st.session_state.crisis_detector.analyze_text_for_crisis(user_input)
-        crisis_detected = st.session_state.crisis_detector.trigger_crisis_intervention(risk_assessment)
-        
-        conversation_history = st.session_state.data_manager.get_conversation_history()
-        
+
+        with st.chat_message("user"):
+            st.write(user_input)
+        assistant_box = st.chat_message("assistant")
+
+        keyword_risk = st.session_state.crisis_detector.screen_keywords(user_input)
+        risk_assessment = None
+        ai_response = None
         try:
             if st.session_state.gemini_client is None:
                 raise RuntimeError("Gemini client unavailable. Check API key.")
-            
-            ai_response = st.session_state.gemini_client.get_empathetic_response(
-                user_input, 
-                st.session_state.current_persona,
-                conversation_history
+
+            if st.session_state.crisis_detector.needs_ai_review(user_input, keyword_risk):
+                # One structured call returns both the reply and the AI risk assessment
+                with assistant_box, st.spinner("Thinking..."):
+                    result = st.session_state.gemini_client.respond_and_assess(
+                        user_input,
+                        st.session_state.current_persona,
+                        history_lines,
+                        summary=st.session_state.chat_summary
+                    )
+                ai_response = result.pop("reply")
+                risk_assessment = st.session_state.crisis_detector.analyze_text_for_crisis(
+                    user_input, ai_analysis=result, keyword_risk=keyword_risk
+                )
+                with assistant_box:
+                    st.markdown(ai_response)
+            else:
+                # No crisis keywords: stream a plain reply, cached replies allowed.
+                # The assessment needs no AI call here, so it is computed inline.
+                risk_assessment = st.session_state.crisis_detector.analyze_text_for_crisis(
+                    user_input, keyword_risk=keyword_risk
+                )
+                chunks = st.session_state.gemini_client.stream_empathetic_response(
+                    user_input,
+                    st.session_state.current_persona,
+                    history_lines,
+                    response_cache=st.session_state.response_cache,
+                    summary=st.session_state.chat_summary
+                )
+                with assistant_box:
+                    ai_response = st.write_stream(_throttle(chunks))
+            if not ai_response:
+                ai_response = "I'm here with you — could you share a little more?"
+                with assistant_box:
+                    st.write(ai_response)
+        except Exception:
+            logger.exception("Failed to get assistant response")
+            st.toast("Gemini temporarily unavailable")
+
+        reply_failed = ai_response is None
+        if reply_failed:
+            # Show a fallback assistant message so user gets something instead of nothing
+            ai_response = "Sorry — I'm having trouble generating a response right now. Please try again in a moment."
+            with assistant_box:
+                st.write(ai_response)
+
+        if risk_assessment is None:
+            # The reply failed before an assessment was made; the detector
+            # runs its own AI analysis instead
+            risk_assessment = st.session_state.crisis_detector.analyze_text_for_crisis(
+                user_input, keyword_risk=keyword_risk
             )
-            print("DEBUG-GEMINI-RESPONSE:", ai_response) ##added lines
+        crisis_detected = st.session_state.crisis_detector.trigger_crisis_intervention(risk_assessment)
+
+        if crisis_detected and not reply_failed:
+            follow_up = st.session_state.crisis_detector.get_crisis_follow_up_message(risk_assessment["final_risk_level"])
+            with assistant_box:
+                st.write(follow_up)
+            ai_response = f"{ai_response}\n\n{follow_up}"
+
+        if user_message is not None:
+            user_message["risk_level"] = risk_assessment["final_risk_level"]
 
-            if crisis_detected:
-                follow_up = st.session_state.crisis_detector.get_crisis_follow_up_message(risk_assessment["final_risk_level"])
-                ai_response = f"{ai_response}\n\n{follow_up}"
-            
-            st.session_state.data_manager.save_chat_message("assistant", ai_response, persona=st.session_state.current_persona)
+        try:
+            st.session_state.data_manager.save_chat_message(
+                "assistant", ai_response, persona=st.session_state.current_persona
+            )
         except Exception as e:
-            st.error(f"Error getting assistant response: {e}")
-            # Save fallback assistant message so user gets something instead of nothing
-            fallback = "Sorry — I'm having trouble generating a response right now. Please try again in a moment."
-            try:
-                st.session_state.data_manager.save_chat_message("assistant", fallback, persona=st.session_state.current_persona)
-            except Exception:
-                pass
+            st.error(f"Error saving assistant message: {e}")
+
+        _schedule_summary()
 
         # Do not call st.rerun() immediately — let the UI update normally.
 
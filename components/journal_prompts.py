@@ -1,6 +1,6 @@
 import streamlit as st # type: ignore
 from datetime import datetime
-from utils.gemini_client import GeminiClient  # 🌟 CHANGE: Import GeminiClient
+from utils.gemini_client import get_gemini_client
 from data.journal_prompts import JOURNAL_PROMPTS, CBT_PROMPTS
 
 def render_journal_prompts():
@@ -11,7 +11,7 @@ def render_journal_prompts():
     
     # Initialize Gemini client
     if 'gemini_client' not in st.session_state: # 🌟 CHANGE: Client variable name
-        st.session_state.gemini_client = GeminiClient() # 🌟 CHANGE: Use GeminiClient
+        st.session_state.gemini_client = get_gemini_client()
     
     # Create tabs
     tab1, tab2, tab3 = st.tabs(["✍️ New Entry", "📚 Your Entries", "🤖 AI-Personalized"])
@@ -182,7 +182,15 @@ def render_ai_personalized_prompts():
         st.info("🔄 **Not enough data yet!** To get personalized prompts, log a few moods or write a journal entry.")
         return
     
-    if st.button("✨ Generate Personalized Prompt", type="primary"):
+    # Identical mood context reuses the last prompt for an hour; "New Prompt"
+    # always asks Gemini for a fresh one
+    col1, col2 = st.columns(2)
+    with col1:
+        generate = st.button("✨ Generate Personalized Prompt", type="primary")
+    with col2:
+        regenerate = st.button("🔄 New Prompt")
+
+    if generate or regenerate:
         with st.spinner("Creating your personalized prompt..."):
             recent_moods = st.session_state.data_manager.get_recent_mood_data(7)
             recent_themes = st.session_state.data_manager.get_journal_themes()
@@ -194,7 +202,9 @@ def render_ai_personalized_prompts():
                 # 🌟 CHANGE: Use gemini_client and new method
                 personalized_prompt = st.session_state.gemini_client.generate_personalized_journal_prompt(
                     mood_context, 
-                    recent_themes[:3]
+                    recent_themes[:3],
+                    refresh=regenerate,
+                    prompt_cache=st.session_state.prompt_cache
                 )
                 st.success("✨ Your Personalized Prompt")
                 st.info(f"**{personalized_prompt['prompt']}**")
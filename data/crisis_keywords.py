@@ -72,12 +72,13 @@ PROTECTIVE_FACTORS = [
 ]
 
 # Context patterns that might indicate higher risk
+# Gaps are bounded (.{0,40}) so matching stays linear on long input
 HIGH_RISK_PATTERNS = [
-    r"\b(tonight|today|right now|immediately|can't wait)\b.*\b(suicide|kill|die|end)\b",
-    r"\b(plan|planning|decided|going to)\b.*\b(suicide|kill myself|end my life)\b",
-    r"\b(pills|rope|gun|bridge|jump)\b.*\b(suicide|kill|die)\b",
-    r"\b(final|last|goodbye|farewell)\b.*\b(message|time|chance)\b",
-    r"\b(can't take|won't make it|end of the line)\b.*\b(anymore|through this)\b"
+    r"\b(tonight|today|right now|immediately|can't wait)\b.{0,40}\b(suicide|kill|die|end)\b",
+    r"\b(plan|planning|decided|going to)\b.{0,40}\b(suicide|kill myself|end my life)\b",
+    r"\b(pills|rope|gun|bridge|jump)\b.{0,40}\b(suicide|kill|die)\b",
+    r"\b(final|last|goodbye|farewell)\b.{0,40}\b(message|time|chance)\b",
+    r"\b(can't take|won't make it|end of the line)\b.{0,40}\b(anymore|through this)\b"
 ]
 
 # Phrases that indicate immediate intervention needed
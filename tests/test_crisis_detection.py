@@ -0,0 +1,75 @@
+import random
+import re
+
+import pytest
+
+from data.crisis_keywords import CRISIS_KEYWORDS, SEVERITY_WEIGHTS
+from utils.crisis_detection import CrisisDetector
+
+
+def reference_keyword_detection(text):
+    """The original matcher: one word-boundary search per keyword"""
+    text_lower = text.lower()
+    detected_keywords = []
+    total_score = 0
+
+    for category, keywords in CRISIS_KEYWORDS.items():
+        for keyword in keywords:
+            if re.search(r"\b" + re.escape(keyword.lower()) + r"\b", text_lower):
+                detected_keywords.append((keyword, category))
+                total_score += SEVERITY_WEIGHTS.get(category, 1)
+
+    return detected_keywords, total_score
+
+
+ALL_KEYWORDS = [k for keywords in CRISIS_KEYWORDS.values() for k in keywords]
+FILLER = ["i", "feel", "today", "so", "the", "and", "really", "myself", "life",
+          "end", "kill", "self", "my", "it", "all", "cut", "die", "want", "to"]
+JOINERS = [" ", " ", " ", "", "-", ".", ", ", "!", "\n", "_", "'"]
+
+
+def random_message(rng):
+    parts = []
+    for _ in range(rng.randint(0, 12)):
+        roll = rng.random()
+        if roll < 0.35:
+            word = rng.choice(ALL_KEYWORDS)
+        elif roll < 0.5:
+            # Truncated keyword, to probe word boundaries and trie prefixes
+            keyword = rng.choice(ALL_KEYWORDS)
+            word = keyword[:rng.randint(1, len(keyword))]
+        else:
+            word = rng.choice(FILLER)
+        if rng.random() < 0.3:
+            word = "".join(c.upper() if rng.random() < 0.5 else c for c in word)
+        parts.append(word)
+        parts.append(rng.choice(JOINERS))
+    return "".join(parts)
+
+
+@pytest.fixture(scope="module")
+def detector():
+    return CrisisDetector()
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "I had a nice day",
+    "suicide plan",
+    "I want to kill myself and end it all",
+    "self-harm and self harm",
+    "WISH I WAS DEAD",
+    "razors",
+    "killmyself",
+])
+def test_keyword_detection_matches_reference_examples(detector, text):
+    result = detector.screen_keywords(text)
+    assert (result["detected_keywords"], result["score"]) == reference_keyword_detection(text)
+
+
+def test_keyword_detection_matches_reference_fuzzed(detector):
+    rng = random.Random(20240601)
+    for _ in range(5000):
+        text = random_message(rng)
+        result = detector.screen_keywords(text)
+        assert (result["detected_keywords"], result["score"]) == reference_keyword_detection(text), text
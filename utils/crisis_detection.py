@@ -1,7 +1,7 @@
 import re
 import streamlit as st
-from utils.gemini_client import GeminiClient
-from data.crisis_keywords import CRISIS_KEYWORDS, SEVERITY_WEIGHTS
+from utils.gemini_client import get_gemini_client
+from data.crisis_keywords import CRISIS_KEYWORDS, SEVERITY_WEIGHTS, HIGH_RISK_PATTERNS
 
 
 _CANON_LEVELS = {
@@ -16,19 +16,110 @@ _CANON_LEVELS = {
     "SEVERE": "CRITICAL"
 }
 
+# Unbounded wildcards (".*", ".+") and quantified groups ("(...)*") can
+# backtrack badly on crafted input. Keywords are matched as escaped literals,
+# so such syntax there is always a mistake; regex patterns must bound gaps,
+# e.g. ".{0,40}".
+_UNBOUNDED_QUANTIFIER = re.compile(r"\.[*+]|\)[*+]")
+
+
+def _validate_patterns():
+    for category, keywords in CRISIS_KEYWORDS.items():
+        for keyword in keywords:
+            if _UNBOUNDED_QUANTIFIER.search(keyword):
+                raise ValueError(f"Crisis keyword {keyword!r} ({category}) contains regex wildcards")
+    for pattern in HIGH_RISK_PATTERNS:
+        if _UNBOUNDED_QUANTIFIER.search(pattern):
+            raise ValueError(f"High-risk pattern {pattern!r} has an unbounded quantifier")
+
+
+_validate_patterns()
+
+
+# Regex source matching any of the keywords. Keywords are merged into a
+# character trie so the engine follows one branch per character instead of
+# retrying every keyword at every position like a flat "a|b|c" alternation.
+def _trie_regex(keywords):
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def to_regex(node):
+        is_end = "" in node
+        branches = [re.escape(char) + to_regex(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")" + ("?" if is_end else "")
+
+    return to_regex(trie)
+
+
+# One word-boundary pattern per category, compiled at import. A category
+# whose pattern finds nothing is skipped without touching its per-keyword
+# patterns.
+_CATEGORY_PATTERNS = {
+    category: re.compile(
+        r"\b(?:" + _trie_regex(k.lower() for k in keywords) + r")\b"
+    )
+    for category, keywords in CRISIS_KEYWORDS.items()
+}
+
+# All keywords of every category in a single pattern without word
+# boundaries: a keyword can only match on word boundaries if it occurs as a
+# plain substring, so one scan rejects most benign messages up front.
+_ANY_KEYWORD = re.compile(
+    _trie_regex({k.lower() for keywords in CRISIS_KEYWORDS.values() for k in keywords})
+)
+
+# Per-keyword word-boundary patterns, escaped and compiled once at import.
+# Keywords are lowered so they line up with the lowered message text.
+_COMPILED_KEYWORDS = {
+    category: [
+        (re.compile(r"\b" + re.escape(keyword.lower()) + r"\b"), keyword)
+        for keyword in keywords
+    ]
+    for category, keywords in CRISIS_KEYWORDS.items()
+}
+
+# AI review policy: a message with no crisis keywords (score 0) that is
+# shorter than this many characters is treated as LOW risk without calling
+# Gemini. Any keyword hit, or a longer message where keywords may not
+# capture the context, is always sent to the AI classifier.
+AI_REVIEW_MIN_LENGTH = 400
+
+
+@st.cache_resource
+def get_crisis_detector():
+    # Keyword matchers are compiled once per server process
+    return CrisisDetector()
+
 
 class CrisisDetector:
     def __init__(self):
         try:
-            self.gemini_client = st.session_state.get("gemini_client") or GeminiClient()
+            self.gemini_client = get_gemini_client()
         except Exception:
             self.gemini_client = None
 
-        self.crisis_keywords = CRISIS_KEYWORDS
         self.severity_weights = SEVERITY_WEIGHTS
 
-    def analyze_text_for_crisis(self, text):
-        keyword_risk = self._keyword_based_detection(text)
+    def needs_ai_review(self, text, keyword_risk):
+        return keyword_risk["score"] > 0 or len(text) >= AI_REVIEW_MIN_LENGTH
+
+    def analyze_text_for_crisis(self, text, ai_analysis=None, keyword_risk=None):
+        # ai_analysis may be supplied by a combined reply + assessment call,
+        # keyword_risk by an earlier screen_keywords() on the same text
+        if keyword_risk is None:
+            keyword_risk = self._keyword_based_detection(text.lower())
+
+        if ai_analysis is not None:
+            return self._combine_risk_assessments(keyword_risk, ai_analysis)
 
         ai_analysis = {
             "risk_level": "LOW",
@@ -36,7 +127,13 @@ class CrisisDetector:
             "analysis": "AI unavailable"
         }
 
-        if self.gemini_client:
+        if not self.needs_ai_review(text, keyword_risk):
+            ai_analysis = {
+                "risk_level": "LOW",
+                "keywords_detected": [],
+                "analysis": "skipped-low-risk"
+            }
+        elif self.gemini_client:
             try:
                 result = self.gemini_client.analyze_text_for_crisis(text)
                 if isinstance(result, dict):
@@ -47,16 +144,24 @@ class CrisisDetector:
         combined = self._combine_risk_assessments(keyword_risk, ai_analysis)
         return combined
 
-    def _keyword_based_detection(self, text):
-        text_lower = text.lower()
+    def screen_keywords(self, text):
+        return self._keyword_based_detection(text.lower())
+
+    def _keyword_based_detection(self, text_lower):
         detected_keywords = []
         total_score = 0
 
-        for category, keywords in self.crisis_keywords.items():
-            for keyword in keywords:
-                if re.search(r"\b" + re.escape(keyword) + r"\b", text_lower):
-                    detected_keywords.append((keyword, category))
-                    total_score += self.severity_weights.get(category, 1)
+        if _ANY_KEYWORD.search(text_lower):
+            for category, category_pattern in _CATEGORY_PATTERNS.items():
+                if not category_pattern.search(text_lower):
+                    continue
+                # Alternation matches don't overlap ("suicide" vs "suicide plan"),
+                # so confirm each keyword individually once the category is hit.
+                weight = self.severity_weights.get(category, 1)
+                for pattern, keyword in _COMPILED_KEYWORDS[category]:
+                    if pattern.search(text_lower):
+                        detected_keywords.append((keyword, category))
+                        total_score += weight
 
         if total_score >= 10:
             level = "critical"
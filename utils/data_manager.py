@@ -1,9 +1,11 @@
 import json
 import streamlit as st # type: ignore
+from collections import deque
 from datetime import datetime, timedelta
 from cryptography.fernet import Fernet
 import base64
 import os
+from utils.response_cache import ResponseCache, PromptCache
 
 class DataManager:
     def __init__(self, user_id):
@@ -14,6 +16,19 @@ class DataManager:
         # Initialize session state data structures
         if 'chat_history' not in st.session_state:
             st.session_state.chat_history = []
+        if 'formatted_history' not in st.session_state:
+            st.session_state.formatted_history = deque(maxlen=10)
+        if 'response_cache' not in st.session_state:
+            # Per session: cached replies are derived from this user's messages
+            st.session_state.response_cache = ResponseCache()
+        if 'prompt_cache' not in st.session_state:
+            # Per session: memoized CBT insights and journal prompts embed user data
+            st.session_state.prompt_cache = PromptCache(maxsize=64, ttl=3600)
+        if 'chat_summary' not in st.session_state:
+            st.session_state.chat_summary = ""
+            # Number of chat_history messages folded into chat_summary
+            st.session_state.summarized_messages = 0
+            st.session_state.summary_future = None
         if 'mood_entries' not in st.session_state:
             st.session_state.mood_entries = []
         if 'journal_entries' not in st.session_state:
@@ -55,6 +70,14 @@ class DataManager:
             "risk_level": risk_level
         }
         st.session_state.chat_history.append(message)
+        # Rolling transcript lines for AI context, kept ready to join
+        st.session_state.formatted_history.append(f"{role.upper()}: {content}")
+        return message
+
+    def get_transcript(self, start=0, end=None):
+        """Transcript lines for chat_history[start:end], formatted for AI context"""
+        messages = st.session_state.chat_history[start:end]
+        return [f"{m['role'].upper()}: {m['content']}" for m in messages]
     
     def save_mood_entry(self, mood_data):
         """Save mood tracking data"""
@@ -187,6 +210,12 @@ class DataManager:
     def delete_all_data(self):
         """Securely delete all user data"""
         st.session_state.chat_history = []
+        st.session_state.formatted_history = deque(maxlen=10)
+        st.session_state.response_cache.clear()
+        st.session_state.prompt_cache.clear()
+        st.session_state.chat_summary = ""
+        st.session_state.summarized_messages = 0
+        st.session_state.summary_future = None
         st.session_state.mood_entries = []
         st.session_state.journal_entries = []
         st.session_state.cbt_records = []
@@ -195,16 +224,3 @@ class DataManager:
         # Generate new encryption key
         st.session_state.encryption_key = Fernet.generate_key()
         self.fernet = Fernet(st.session_state.encryption_key)
-    
-    def get_conversation_history(self, limit=10):
-        """Get recent conversation history for AI context"""
-        recent_messages = st.session_state.chat_history[-limit:]
-        conversation = []
-        
-        for msg in recent_messages:
-            conversation.append({
-                "role": msg["role"],
-                "content": msg["content"]
-            })
-        
-        return conversation
@@ -1,11 +1,29 @@
 import os
+import re
+import copy
 import json
 import streamlit as st
 import google.generativeai as genai
 import time
-from google.genai.errors import ServerError
+from google.api_core import exceptions as google_exceptions
+
+# orjson parses model JSON in C; fall back to the stdlib when it isn't installed
+try:
+    import orjson
+
+    def _loads(raw):
+        return orjson.loads(raw)
+
+    def _dumps(obj):
+        return orjson.dumps(obj).decode()
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
 
 MODEL = "gemini-2.0-flash"
+FALLBACK_MODEL = "gemini-1.5-flash"
 
 BASE_SYSTEM_INSTRUCTION = """
 You are a compassionate, non-judgmental, and supportive mental wellness companion.
@@ -27,6 +45,40 @@ Return ONLY a JSON object:
 }
 """
 
+RESPOND_AND_ASSESS_INSTRUCTION = """
+Put your reply to the user in "reply". Set "risk_level" to one of
+LOW, MODERATE, HIGH or SEVERE, list any crisis phrases in "keywords",
+and give short reasoning in "analysis".
+"""
+
+RESPOND_AND_ASSESS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "reply": {"type": "string"},
+        "risk_level": {"type": "string", "enum": ["LOW", "MODERATE", "HIGH", "SEVERE"]},
+        "keywords": {"type": "array", "items": {"type": "string"}},
+        "analysis": {"type": "string"}
+    },
+    "required": ["reply", "risk_level"]
+}
+
+SUMMARY_INSTRUCTION = "Summarize the user state and themes in 2 sentences."
+
+# Turns always sent verbatim alongside a conversation summary
+RECENT_TURNS = 2
+
+PERSONAS = {
+    "peer": "Respond like a warm, supportive peer listener.",
+    "mentor": "Respond like a kind, encouraging mentor.",
+    "therapist": "Respond like a gentle therapeutic companion (no diagnosis)."
+}
+
+@st.cache_resource
+def get_gemini_client():
+    # One client per server process, shared by every session and rerun
+    return GeminiClient()
+
+
 class GeminiClient:
     def __init__(self):
         api_key = os.environ.get("GEMINI_API_KEY")
@@ -35,84 +87,225 @@ class GeminiClient:
 
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(MODEL)
+        self._models = {(MODEL, None): self.model}
+
+    def _get_model(self, model_name=MODEL, system_instruction=None):
+        # One model per (name, system instruction): the static instructions
+        # go in system_instruction instead of being pasted into each prompt.
+        key = (model_name, system_instruction)
+        if key not in self._models:
+            self._models[key] = genai.GenerativeModel(
+                model_name, system_instruction=system_instruction
+            )
+        return self._models[key]
+
+    def _persona_instruction(self, persona):
+        persona_text = PERSONAS.get(persona, PERSONAS["therapist"])
+        return f"{BASE_SYSTEM_INSTRUCTION}\nPersona style: {persona_text}\n"
+
+    def _extract_text(self, response):
+        # response.text is the SDK's accessor for the first candidate's text
+        # parts; it raises ValueError when the candidate was blocked or empty.
+        try:
+            return response.text
+        except ValueError:
+            return None
 
     # ------------------------------------------------------
     # SAFE INTERNAL GEMINI CALL (retry + fallback)
     # ------------------------------------------------------
-    def _generate(self, prompt, json_output=False, max_retries=3):
+    def _generate(self, prompt, json_output=False, max_retries=3, system_instruction=None,
+                  response_schema=None):
+        model = self._get_model(MODEL, system_instruction)
+        generation_config = {
+            "response_mime_type": (
+                "application/json" if json_output else "text/plain"
+            )
+        }
+        if response_schema:
+            generation_config["response_schema"] = response_schema
+
         for attempt in range(max_retries):
             try:
-                response = self.model.generate_content(
+                response = model.generate_content(
                     prompt,
-                    generation_config={
-                        "response_mime_type": (
-                            "application/json" if json_output else "text/plain"
-                        )
-                    }
+                    generation_config=generation_config
                 )
-                return response.text
+                return self._extract_text(response)
 
-            except ServerError as e:
-                if "503" in str(e) or "overloaded" in str(e).lower():
-                    time.sleep(1.5)
-                    continue
-                raise e
+            except google_exceptions.ServiceUnavailable:
+                # 503 / model overloaded: back off and retry
+                time.sleep(1.5)
+                continue
 
             except Exception as e:
                 raise RuntimeError(f"Gemini request failed: {e}")
 
         # Fallback model
         try:
-            fallback = genai.GenerativeModel("gemini-1.5-flash")
+            fallback = self._get_model(FALLBACK_MODEL, system_instruction)
             response = fallback.generate_content(
                 prompt,
-                generation_config={
-                    "response_mime_type": (
-                        "application/json" if json_output else "text/plain"
-                    )
-                }
+                generation_config=generation_config
             )
-            return response.text
+            return self._extract_text(response)
 
         except:
             return None
 
     # ------------------------------------------------------
-    # NORMAL EMPATHETIC CHAT
+    # MEMOIZED JSON CALL (for prompts built only from structured input)
     # ------------------------------------------------------
-    def get_empathetic_response(self, user_input, persona, conversation_history):
-        personas = {
-            "peer": "Respond like a warm, supportive peer listener.",
-            "mentor": "Respond like a kind, encouraging mentor.",
-            "therapist": "Respond like a gentle therapeutic companion (no diagnosis)."
-        }
+    def _parse_json(self, raw):
+        if not raw:
+            return None
+        try:
+            return _loads(raw)
+        except:
+            match = re.search(r"\{.*\}", raw, re.DOTALL)
+            if match:
+                try:
+                    return _loads(match.group())
+                except:
+                    pass
+        return None
 
-        persona_text = personas.get(persona, personas["therapist"])
+    def _generate_json_memoized(self, prompt, prompt_cache=None, refresh=False):
+        # Returns (parsed, raw). prompt_cache belongs to the caller's session,
+        # as prompts embed user data. Only successfully parsed results are
+        # cached, so one malformed reply isn't replayed for the whole TTL;
+        # refresh skips the lookup for an explicit "give me a new one".
+        if prompt_cache is None:
+            raw = self._generate(prompt, json_output=True)
+            return self._parse_json(raw), raw
 
-        chat_text = ""
-        for msg in conversation_history[-10:]:
-            chat_text += f"{msg['role'].upper()}: {msg['content']}\n"
+        key = prompt_cache.make_key(MODEL, prompt)
+        if not refresh:
+            cached = prompt_cache.get(key)
+            if cached is not None:
+                return copy.deepcopy(cached), None
 
-        chat_text += f"USER: {user_input}"
+        raw = self._generate(prompt, json_output=True)
+        parsed = self._parse_json(raw)
+        if parsed is not None:
+            prompt_cache.put(key, copy.deepcopy(parsed))
+        return parsed, raw
 
-        full_prompt = f"""
-{BASE_SYSTEM_INSTRUCTION}
+    # ------------------------------------------------------
+    # STREAMING GEMINI CALL (yields text chunks as they arrive)
+    # ------------------------------------------------------
+    def _generate_stream(self, prompt, system_instruction=None):
+        model = self._get_model(MODEL, system_instruction)
+        try:
+            response = model.generate_content(prompt, stream=True)
+            for chunk in response:
+                text = self._extract_text(chunk)
+                if text:
+                    yield text
+        except Exception as e:
+            raise RuntimeError(f"Gemini request failed: {e}")
 
-Persona style: {persona_text}
+    # ------------------------------------------------------
+    # NORMAL EMPATHETIC CHAT
+    # ------------------------------------------------------
+    def _build_chat_prompt(self, user_input, history_lines, summary=""):
+        # history_lines are pre-formatted "ROLE: content" lines; with a
+        # summary they are the messages it does not cover yet.
+        summary_text = ""
+        if summary:
+            summary_text = f"Summary of earlier conversation:\n{summary}\n\n"
 
-Conversation history:
+        chat_text = "\n".join([*history_lines, f"USER: {user_input}"])
+
+        return f"""
+{summary_text}Conversation history:
 {chat_text}
 
 Respond empathically, briefly, and safely.
 """
 
-        reply = self._generate(full_prompt)
+    def get_empathetic_response(self, user_input, persona, history_lines, summary=""):
+        full_prompt = self._build_chat_prompt(user_input, history_lines, summary)
+        reply = self._generate(
+            full_prompt, system_instruction=self._persona_instruction(persona)
+        )
         return reply or "I'm here with you — could you share a little more?"
 
+    def stream_empathetic_response(self, user_input, persona, history_lines, response_cache=None,
+                                   summary=""):
+        # response_cache belongs to the caller's session; this client is shared
+        # by every session and must never hold user-derived replies itself.
+        # Only opening messages are cached: with no history and no summary the
+        # reply depends on nothing but the persona and the message, so it is
+        # safe to reuse.
+        cacheable = response_cache is not None and not history_lines and not summary
+        if cacheable:
+            cached = response_cache.get(persona, user_input)
+            if cached:
+                return iter([cached])
+
+        full_prompt = self._build_chat_prompt(user_input, history_lines, summary)
+        stream = self._generate_stream(
+            full_prompt, system_instruction=self._persona_instruction(persona)
+        )
+        if not cacheable:
+            return stream
+        return self._cache_stream(stream, response_cache, persona, user_input)
+
+    def _cache_stream(self, stream, response_cache, persona, user_input):
+        parts = []
+        for chunk in stream:
+            parts.append(chunk)
+            yield chunk
+        response_cache.put(persona, user_input, "".join(parts))
+
+    # ------------------------------------------------------
+    # CHAT REPLY + CRISIS ASSESSMENT IN ONE CALL
+    # ------------------------------------------------------
+    def respond_and_assess(self, user_input, persona, history_lines, summary=""):
+        prompt = self._build_chat_prompt(user_input, history_lines, summary) + f"""
+Also assess the crisis risk of the latest USER message.
+{RESPOND_AND_ASSESS_INSTRUCTION}
+"""
+        raw = self._generate(
+            prompt,
+            json_output=True,
+            system_instruction=self._persona_instruction(persona),
+            response_schema=RESPOND_AND_ASSESS_SCHEMA
+        )
+
+        result = self._parse_json(raw)
+        if not isinstance(result, dict):
+            result = {"analysis": "Could not parse AI JSON."}
+
+        return {
+            "reply": result.get("reply") or "I'm here with you — could you share a little more?",
+            # Unparseable assessments are treated as MODERATE, as in analyze_text_for_crisis
+            "risk_level": result.get("risk_level", "MODERATE"),
+            "keywords_detected": result.get("keywords", []),
+            "analysis": result.get("analysis", "")
+        }
+
+    # ------------------------------------------------------
+    # CONVERSATION SUMMARY (replaces older turns in chat prompts)
+    # ------------------------------------------------------
+    def summarize_conversation(self, summary, history_lines):
+        transcript = "\n".join(history_lines)
+        prompt = f"""
+{SUMMARY_INSTRUCTION}
+
+Earlier summary:
+{summary or "(none)"}
+
+Recent conversation:
+{transcript}
+"""
+        return self._generate(prompt)
+
     # ------------------------------------------------------
     # CBT JSON INSIGHT
     # ------------------------------------------------------
-    def generate_cbt_insight(self, thought_record: dict) -> dict:
+    def generate_cbt_insight(self, thought_record: dict, prompt_cache=None) -> dict:
         prompt = f"""
 Return a JSON object with ONLY:
 - cognitive_distortions
@@ -120,45 +313,36 @@ Return a JSON object with ONLY:
 - encouragement
 
 Here is the user's CBT thought record:
-{json.dumps(thought_record, indent=2)}
+{_dumps(thought_record)}
 """
         
-        raw = self._generate(prompt, json_output=True)
+        parsed, raw = self._generate_json_memoized(prompt, prompt_cache)
 
+        if parsed is not None:
+            return parsed
         if not raw:
             return {"error": "AI returned no response."}
-        try:
-            return json.loads(raw)
-        except:
-            import re
-            match = re.search(r"\{.*\}", raw, re.DOTALL)
-            if match:
-                try:
-                    return json.loads(match.group())
-                except:
-                    pass
-            return {"error": "Failed to parse AI JSON. AI output may be malformed."}
-            # return {"error": "Failed to parse CBT JSON."}
+        return {"error": "Failed to parse AI JSON. AI output may be malformed."}
 
     # ------------------------------------------------------
     # JOURNAL PROMPT JSON
     # ------------------------------------------------------
-    def generate_personalized_journal_prompt(self, mood_context, recent_themes):
+    def generate_personalized_journal_prompt(self, mood_context, recent_themes, refresh=False,
+                                             prompt_cache=None):
         prompt = f"""
 Return a JSON object with:
 - prompt
 - follow_up_questions
 
 Mood context:
-{json.dumps(mood_context, indent=2)}
+{_dumps(mood_context)}
 
 Themes: {recent_themes}
 """
-        raw = self._generate(prompt, json_output=True)
-        try:
-            return json.loads(raw)
-        except:
-            return {"error": "Failed to parse journal prompt JSON."}
+        parsed, _ = self._generate_json_memoized(prompt, prompt_cache, refresh=refresh)
+        if parsed is not None:
+            return parsed
+        return {"error": "Failed to parse journal prompt JSON."}
 
     # ------------------------------------------------------
     # CRISIS DETECTION JSON
@@ -169,7 +353,7 @@ Themes: {recent_themes}
         raw = self._generate(prompt, json_output=True)
 
         try:
-            return json.loads(raw)
+            return _loads(raw)
         except:
             return {
                 "risk_level": "MODERATE",
@@ -0,0 +1,86 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """In-memory cache of assistant replies keyed by persona and normalized message text
+
+    Messages match when they have the same words ignoring case and
+    punctuation, e.g. "I'm stressed!" and "i'm stressed".
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, persona, text):
+        normalized = " ".join(re.findall(r"\w+", text.lower()))
+        return persona, hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, persona, text):
+        """Return the cached reply for text, or None"""
+        key = self._key(persona, text)
+        with self._lock:
+            reply = self._entries.get(key)
+            if reply is not None:
+                self._entries.move_to_end(key)
+            return reply
+
+    def put(self, persona, text, reply):
+        """Store a reply; the least recently used entry is dropped when full"""
+        if not reply:
+            return
+        key = self._key(persona, text)
+        with self._lock:
+            self._entries[key] = reply
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class PromptCache:
+    """Thread-safe LRU cache of model output for exact prompts, with a TTL"""
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def make_key(self, *parts):
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(str(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()